@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Tuple
 
@@ -9,10 +10,12 @@ from crystal_toolkit.helpers.layouts import Container
 from crystal_toolkit import CrystalToolkitPlugin
 from pymatgen.core import Structure
 
+from make_unit_cells import list_cifs
+
 
 def load_pairs(systems_dir: Path, prim_dir: Path) -> List[Tuple[str, Path, Path | None]]:
     pairs: List[Tuple[str, Path, Path | None]] = []
-    for cif in sorted(systems_dir.glob("*.cif")):
+    for cif in list_cifs(systems_dir):
         name = cif.stem
         prim = prim_dir / f"{name}_primitive.cif"
         pairs.append((name, cif, prim if prim.exists() else None))
@@ -69,6 +72,17 @@ def create_app() -> Dash:
 
     # No manual registration needed when using CrystalToolkitPlugin
 
+    @lru_cache(maxsize=None)
+    def _load(name: str) -> Tuple[dict, dict | None]:
+        # Parse and serialize each system once; later selections are a cache hit
+        orig_path, prim_path = name_to_paths[name]
+        orig = Structure.from_file(str(orig_path))
+        prim = Structure.from_file(str(prim_path)) if prim_path and prim_path.exists() else None
+        # Provide JSON-serializable data (MSON) to the components' data stores
+        orig_data = orig.as_dict()
+        prim_data = prim.as_dict() if prim else None
+        return orig_data, prim_data
+
     @app.callback(
         Output(struct_component.id(), "data"),
         Output(prim_component.id(), "data"),
@@ -78,13 +92,7 @@ def create_app() -> Dash:
     def update_structures(name: str):
         if not name:
             return None, None
-        orig_path, prim_path = name_to_paths[name]
-        orig = Structure.from_file(str(orig_path))
-        prim = Structure.from_file(str(prim_path)) if prim_path and prim_path.exists() else None
-        # Provide JSON-serializable data (MSON) to the components' data stores
-        orig_data = orig.as_dict()
-        prim_data = prim.as_dict() if prim else None
-        return orig_data, prim_data
+        return _load(name)
 
     return app
 
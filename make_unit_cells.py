@@ -1,64 +1,171 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 from pymatgen.core import Structure
-from pymatgen.io.cif import CifWriter
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
 
 def reduce_to_primitive(structure: Structure, symprec: float = 1e-2) -> Structure:
     """
-    Return the primitive standard structure if a reduction is possible; otherwise
+    Return the Niggli-reduced primitive cell if a reduction is possible; otherwise
     return the original structure.
     """
-    # Try two strategies and pick the smallest structure
-    candidates: list[Structure] = []
-    try:
-        direct = structure.get_primitive_structure()
-        candidates.append(direct)
-    except Exception:
-        pass
+    if not structure.is_ordered:
+        # spglib only understands ordered cells; use pymatgen's own reduction
+        try:
+            primitive = structure.get_primitive_structure()
+        except Exception as exc:
+            print(f"[warn] Primitive reduction failed for {structure.formula}: {exc}")
+            return structure
+        return primitive if len(primitive) < len(structure) else structure
 
     try:
+        # Single spglib call; species, oxidation states and site properties are
+        # mapped back onto the primitive sites
         analyzer = SpacegroupAnalyzer(structure, symprec=symprec)
-        prim_std = analyzer.get_primitive_standard_structure(international_monoclinic=False)
-        candidates.append(prim_std)
-    except Exception:
-        pass
+        primitive = analyzer.find_primitive(keep_site_properties=True)
+    except Exception as exc:
+        print(f"[warn] Symmetry analysis failed for {structure.formula}: {exc}")
+        return structure
 
-    if not candidates:
+    if primitive is None or len(primitive) >= len(structure):
         return structure
+    try:
+        # spglib returns a standardized (possibly very sheared) cell; Niggli-reduce it
+        return primitive.get_reduced_structure()
+    except Exception as exc:
+        print(f"[warn] Niggli reduction failed for {structure.formula}: {exc}")
+        return primitive
 
-    best = min(candidates, key=lambda s: (len(s), s.lattice.volume))
-    return best if len(best) < len(structure) else structure
 
+CACHE_NAME = ".cache.json"
+# Bump whenever reduce_to_primitive changes its output so existing files are rebuilt
+REDUCER_VERSION = 1
 
-def process_cif_file(input_path: Path, output_dir: Path, symprec: float = 1e-2) -> Path | None:
+
+def _load_cache(cache_path: Path) -> dict[str, list]:
     """
-    Read a CIF, reduce to primitive unit cell, and write a new CIF.
-    Returns the output path, or None if processing failed.
+    Load the sidecar cache mapping CIF names to [content hash, symprec, reducer version].
+    A missing or unreadable cache is treated as empty, and malformed entries are dropped.
     """
+    try:
+        data = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {name: entry for name, entry in data.items() if isinstance(entry, list) and len(entry) == 3}
+
+
+def _save_cache(cache_path: Path, cache: dict[str, list]) -> None:
+    """
+    Atomically rewrite the sidecar cache.
+    """
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+    os.replace(tmp_path, cache_path)
+
+
+def _output_path(input_path: Path, output_dir: Path) -> Path:
+    return output_dir / (input_path.stem + "_primitive.cif")
+
+
+def _process_cif_file(
+    input_path: Path,
+    output_dir: Path,
+    symprec: float,
+    cache: dict[str, list] | None,
+) -> tuple[Path | None, bool]:
+    """
+    Implementation of `process_cif_file`. Returns the output path (or None on
+    failure) and whether the existing output was reused via the content hash.
+    """
+    output_path = _output_path(input_path, output_dir)
+    output_name = output_path.name
+
+    digest = None
+    if cache is not None:
+        try:
+            digest = hashlib.blake2b(input_path.read_bytes(), digest_size=16).hexdigest()
+        except OSError as exc:
+            print(f"[skip] Failed to read {input_path.name}: {exc}")
+            return None, False
+        if cache.get(input_path.name) == [digest, symprec, REDUCER_VERSION] and output_path.exists():
+            # Input was touched but not changed; refresh the output mtime so the
+            # cheaper mtime check in main applies on the next run
+            try:
+                os.utime(output_path)
+            except OSError:
+                pass
+            return output_path, True
+
     try:
         structure = Structure.from_file(str(input_path))
     except Exception as exc:
         print(f"[skip] Failed to read {input_path.name}: {exc}")
-        return None
+        return None, False
 
     primitive = reduce_to_primitive(structure, symprec=symprec)
 
-    # Compose output filename
-    output_name = input_path.stem + "_primitive.cif"
-    output_path = output_dir / output_name
-
     try:
         # Write as-is (no re-symmetrization) to preserve primitive cell contents
-        CifWriter(primitive, symprec=None).write_file(str(output_path))
-        return output_path
+        primitive.to(filename=str(output_path), fmt="cif")
+        if cache is not None:
+            cache[input_path.name] = [digest, symprec, REDUCER_VERSION]
+        return output_path, False
     except Exception as exc:
         print(f"[skip] Failed to write {output_name}: {exc}")
-        return None
+        return None, False
+
+
+def process_cif_file(
+    input_path: Path,
+    output_dir: Path,
+    symprec: float = 1e-2,
+    cache: dict[str, list] | None = None,
+) -> Path | None:
+    """
+    Read a CIF, reduce to primitive unit cell, and write a new CIF.
+    Returns the output path, or None if processing failed.
+
+    If `cache` is given, processing is skipped when the input content hash,
+    symprec and reducer version match the cached entry and the output already
+    exists; on success the entry for this file is updated in place.
+    """
+    output_path, _ = _process_cif_file(input_path, output_dir, symprec, cache)
+    return output_path
+
+
+def _worker(
+    args: tuple[Path, Path, float, list | None],
+) -> tuple[Path, Path | None, list | None, bool]:
+    """
+    Process-pool entry point: unpack arguments and run `_process_cif_file`.
+    Returns the input path, the output path (or None on failure), the file's
+    (possibly updated) cache entry, and whether the existing output was reused.
+    The entry is handed back because workers cannot mutate the parent's cache.
+    """
+    input_path, output_dir, symprec, entry = args
+    cache = {input_path.name: entry} if entry is not None else {}
+    out, reused = _process_cif_file(input_path, output_dir, symprec, cache)
+    return input_path, out, cache.get(input_path.name), reused
+
+
+def list_cifs(directory: Path) -> list[Path]:
+    """
+    Return the CIF files in `directory`, sorted by name.
+    Uses os.scandir so file-type checks come from the directory read itself.
+    """
+    return sorted(
+        (Path(e.path) for e in os.scandir(directory) if e.name.lower().endswith(".cif") and e.is_file()),
+        key=lambda p: p.name,
+    )
 
 
 def main() -> int:
@@ -71,19 +178,65 @@ def main() -> int:
         print(f"[error] Missing input directory: {systems_dir}")
         return 1
 
-    cif_files = sorted(p for p in systems_dir.iterdir() if p.suffix.lower() == ".cif")
+    cif_files = list_cifs(systems_dir)
     if not cif_files:
         print(f"[warn] No CIF files found in {systems_dir}")
         return 0
 
     print(f"Found {len(cif_files)} CIF file(s). Reducing to primitive unit cells...")
-    successes = 0
+    cache_path = output_dir / CACHE_NAME
+    cache = _load_cache(cache_path)
+    symprec = 1e-2
+    written = 0
+    skipped = 0
+    pending: list[Path] = []
     for cif_path in cif_files:
-        out = process_cif_file(cif_path, output_dir)
-        if out is not None:
-            successes += 1
-            print(f"[ok] {cif_path.name} -> {out.relative_to(root_dir)}")
-    print(f"Done. Wrote {successes}/{len(cif_files)} primitive CIF(s) to {output_dir.relative_to(root_dir)}")
+        # Outputs newer than their input and built with the same settings are
+        # current; no need to hash or reprocess
+        out = _output_path(cif_path, output_dir)
+        entry = cache.get(cif_path.name)
+        if (
+            entry is not None
+            and entry[1:] == [symprec, REDUCER_VERSION]
+            and out.exists()
+            and out.stat().st_mtime >= cif_path.stat().st_mtime
+        ):
+            skipped += 1
+            print(f"[up-to-date] {cif_path.name} -> {out.relative_to(root_dir)}")
+            continue
+        pending.append(cif_path)
+
+    # Each file's symmetry analysis is independent and CPU-bound, so fan out
+    try:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            futures = {
+                ex.submit(_worker, (p, output_dir, symprec, cache.get(p.name))): p for p in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    cif_path, out, entry, reused = future.result()
+                except Exception as exc:
+                    # Includes BrokenProcessPool if a worker dies inside spglib
+                    print(f"[skip] Failed to process {futures[future].name}: {exc}")
+                    continue
+                if entry is not None:
+                    cache[cif_path.name] = entry
+                if out is None:
+                    continue
+                if reused:
+                    skipped += 1
+                    print(f"[up-to-date] {cif_path.name} -> {out.relative_to(root_dir)}")
+                else:
+                    written += 1
+                    print(f"[ok] {cif_path.name} -> {out.relative_to(root_dir)}")
+    finally:
+        # Keep entries from finished workers even if the run is interrupted
+        _save_cache(cache_path, cache)
+    failed = len(cif_files) - written - skipped
+    print(
+        f"Done. Wrote {written}, {skipped} up to date, {failed} failed "
+        f"({len(cif_files)} CIF(s)) in {output_dir.relative_to(root_dir)}"
+    )
     return 0
 
 